@@ -3,22 +3,27 @@ import asyncio
 import sys
 import os
 import io
+import itertools
 import random
-import re
 import logging
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 # Third-party imports
-import requests
+import aiohttp
+import aiosqlite
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher, html
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
 from aiogram.filters import CommandStart, Command
-from aiogram.types import InputFile, Message
+from aiogram.types import BufferedInputFile, InputFile, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 load_dotenv()
 
@@ -26,69 +31,283 @@ load_dotenv()
 TOKEN = os.getenv("TELEGRAM_API_TOKEN")
 PEXELS_API_KEY = os.getenv("PEXELS_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+TZ_NAME = os.getenv("TZ")
 
-client = OpenAI(
+client = AsyncOpenAI(
   api_key=OPENAI_API_KEY
 )
 
 dp = Dispatcher()
 bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 
-reminders={}
+# Active reminders, stored as parallel dicts keyed by reminder ID
+_r_chat: dict[int, int] = {}
+_r_text: dict[int, str] = {}
+_r_task: dict[int, asyncio.Task] = {}
+# Reminder IDs are never reused, even after a reminder fires or is cancelled
+_next_id = itertools.count(1)
+
+# SQLite database keeping pending reminders across restarts, opened in main()
+REMINDERS_DB_PATH = os.getenv("REMINDERS_DB_PATH", "reminders.db")
+reminders_db = None
+
+# Shared aiohttp session (one connection pool) for Pexels searches and image downloads,
+# created in main() so it lives on the running loop
+http_client = None
+
+# Limiting concurrent calls to each provider, so a burst of /remindme doesn't run into rate limits;
+# created in main(), like http_client, so they belong to the running loop
+PEXELS_CONCURRENCY = 8
+OPENAI_CONCURRENCY = 4
+_pexels_sem = None
+_openai_sem = None
+# Retries when Pexels answers 429 Too Many Requests, waiting Retry-After (or an exponential back-off);
+# the image is optional, so giving up rather than waiting longer than PEXELS_MAX_RETRY_WAIT for a retry
+PEXELS_RETRIES = 2
+PEXELS_MAX_RETRY_WAIT = 2
+
+# LRU cache of Pexels search results keyed by normalized query:
+# query -> (timestamp, (image_url, photographer, photographer_url))
+_pexels_cache = OrderedDict()
+PEXELS_CACHE_SIZE = 512
+PEXELS_CACHE_TTL = 24 * 3600  # Seconds before a query is searched again
+
+# Retries (with exponential back-off, or Telegram's retry_after) for transient errors when sending a reminder
+SEND_RETRIES = 5
+SEND_MAX_BACKOFF = 30
+
+# Maximum lengths of a photo caption and a text message accepted by Telegram
+CAPTION_LIMIT = 1024
+MESSAGE_LIMIT = 4096
 
 # Mapping of time units
 time_units = {"h": 3600, "m": 60, "s": 1}
 
+# Seconds per unit, indexed by byte value (0 for anything that isn't a unit)
+_UNIT = [0] * 256
+for _unit, _seconds in time_units.items():
+    _UNIT[ord(_unit)] = _seconds
+
 # Function to parse flexible time formats
 def parse_time(message_text):
-    # Matching hours, minutes, seconds (handling cases like "10h15m", "2h2m4s", "3.5h")
-    time_pattern = re.compile(r"(\d+(\.\d+)?)(h|m|s)")
+    # Scanning hours, minutes, seconds in a single pass (handling cases like "10h15m", "2h2m4s", "3.5h")
     time_in_seconds = 0
-    matches = time_pattern.findall(message_text)
-    
-    if not matches:
+    found = False
+    num = 0  # Integer part of the current amount
+    frac = 0  # Fractional digits of the current amount
+    div = 0  # 0 while reading the integer part, otherwise 10**(number of fractional digits)
+    has_digits = False
+
+    for b in message_text.encode():
+        if 48 <= b <= 57:  # Digit
+            if div:
+                frac = frac * 10 + b - 48
+                div *= 10
+            else:
+                num = num * 10 + b - 48
+            has_digits = True
+        elif b == 46 and has_digits and div != 1:  # "." after a run of digits
+            if div:  # Like "1.2.3h": the fractional digits start a new amount
+                num, frac = frac, 0
+            div = 1
+        else:
+            unit = _UNIT[b]
+            # A unit only counts right after a complete amount, like "15m" or "3.5h"
+            if unit and has_digits and div != 1:
+                time_in_seconds += (num + frac / div if div else num) * unit
+                found = True
+            num = frac = div = 0
+            has_digits = False
+
+    if not found:
         return
 
-    for match in matches:
-        amount, _, unit = match
-        amount = float(amount) if '.' in amount else int(amount)
-        time_in_seconds += amount * time_units[unit]
-
     return time_in_seconds
 
-async def schedule_reminder(chat_id: int, text: str, scheduled_time, task_id, image_info=None, joke=None):
-    """Waits for the delay and sends a reminder message."""
-    delay = (scheduled_time - datetime.now()).total_seconds()
-    await asyncio.sleep(delay)
-    image_url, photographer, photographer_url = image_info
-    if image_url:  # Checking if image URL is available
-        await bot.send_photo( # Sending the image
-            chat_id,
-            photo=image_url,
-            caption=f"by {photographer or ''} {photographer_url or ''}"
-        )
-        await bot.send_message(
-            chat_id,
-            f"⏰ Reminder: {text}"
-        )
-        if joke:
-            await bot.send_message(
+# Function to look up a time zone by its TZ name, returning None if it isn't a known zone
+def load_time_zone(name):
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name.lstrip(":"))  # ":Europe/Berlin" is a valid TZ value too
+    except (ZoneInfoNotFoundError, ValueError):
+        # Values like "CET-1CEST,M3.5.0,M10.5.0/3" are still understood by the host's local time rules
+        return None
+
+# Time zone for specific-time reminders (like "3:00pm"), or None to use the host's local time rules
+TZ = load_time_zone(TZ_NAME)
+
+# Function to check if the text is a specific time like "13:49" or "6:51pm" (H:MM or HH:MM, optional am/pm)
+def looks_like_hhmm(time_text):
+    colon = time_text.find(":")
+    if colon not in (1, 2):
+        return False
+    suffix_len = len(time_text) - colon - 3
+    if suffix_len == 2:
+        if time_text[-2] not in "apAP" or time_text[-1] not in "mM":
+            return False
+    elif suffix_len != 0:
+        return False
+    digits = time_text[:colon] + time_text[colon + 1:colon + 3]
+    return digits.isascii() and digits.isdigit()
+
+# Function to parse a specific time already checked by looks_like_hhmm (like "13:49" or "6:51pm")
+def parse_hhmm(time_text):
+    hour_text, minute_text = time_text.split(":")
+    hh = int(hour_text)
+    mm = int(minute_text[:2])
+    suffix = minute_text[2:].lower()
+    if suffix:  # 12-hour format
+        if not 1 <= hh <= 12:
+            raise ValueError(f"hour {hh} is out of range for 12-hour format")
+        if suffix == "pm" and hh < 12:
+            hh += 12
+        elif suffix == "am" and hh == 12:
+            hh = 0
+    return dt_time(hh, mm)  # Raises ValueError for hours > 23 or minutes > 59
+
+# Function to format a time for replies, like "05:30 PM"
+def format_time(t):
+    return f"{(t.hour - 1) % 12 + 1:02d}:{t.minute:02d} {'AM' if t.hour < 12 else 'PM'}"
+
+# Function to measure text the way Telegram does, in UTF-16 code units
+def telegram_len(text):
+    return len(text.encode("utf-16-le")) // 2
+
+async def schedule_reminder(chat_id: int, text: str, deadline: float, task_id, image_info=None, joke=None):
+    """Waits until the loop-clock deadline and sends a reminder message."""
+    try:
+        loop = asyncio.get_running_loop()
+        # Sleeping in a loop, since asyncio.sleep may wake up slightly before the deadline
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+        image_bytes, photographer, photographer_url = image_info or (None, None, None)
+        reminder_text = f"⏰ Reminder: {text}"
+        texts = [reminder_text]  # Texts still to be sent as messages
+        if image_bytes:  # Checking if the image was downloaded
+            # Photographer details come from Pexels, so escaping them for HTML parse mode
+            credit = f"by {html.quote(photographer or '')} {html.quote(photographer_url or '')}"
+            caption = f"{reminder_text}\n\n{credit}"
+            # Putting the reminder (and the joke) into the caption, as far as Telegram's caption limit allows
+            if telegram_len(caption) <= CAPTION_LIMIT:
+                texts = []
+                if joke and telegram_len(caption) + 2 + telegram_len(joke) <= CAPTION_LIMIT:
+                    caption += f"\n\n{joke}"
+                    joke = None
+            else:
+                caption = credit
+            await send_with_retry( # Uploading the image
+                task_id,
+                bot.send_photo,
                 chat_id,
-                f"{joke}"
+                photo=BufferedInputFile(image_bytes, filename="img.jpg"),
+                caption=caption
             )
-    else:
-        await bot.send_message(
-            chat_id,
-            f"⏰ Reminder: {text}"  # Sending only the reminder text if image_url is None
-        )
         if joke:
-            await bot.send_message(
-                chat_id,
-                f"{joke}"
-            )
-    del reminders[task_id] 
+            texts.append(joke)
+        # Sending the reminder text and joke together, unless they don't fit into one message
+        if len(texts) == 2 and telegram_len(texts[0]) + 2 + telegram_len(texts[1]) <= MESSAGE_LIMIT:
+            texts = ["\n\n".join(texts)]
+        for message_text in texts:
+            await send_with_retry(task_id, bot.send_message, chat_id, message_text)
+    except asyncio.CancelledError:
+        # Cancelled by the user (who also deletes the stored reminder) or by shutdown (which keeps it)
+        raise
+    except Exception:
+        logging.exception("Failed to send reminder %s", task_id)
+    finally:
+        forget_reminder(task_id)
+    # The reminder has fired (or failed for good), so it must not be restored after a restart
+    await delete_stored_reminder(task_id)
+
+async def send_with_retry(task_id, send, *args, **kwargs):
+    """Calls a Telegram send method, retrying transient errors with a bounded back-off."""
+    for attempt in range(SEND_RETRIES + 1):
+        try:
+            return await send(*args, **kwargs)
+        except TelegramRetryAfter as e:
+            if attempt == SEND_RETRIES:
+                raise
+            wait = e.retry_after
+        except (TelegramNetworkError, TelegramServerError):
+            if attempt == SEND_RETRIES:
+                raise
+            wait = min(2 ** attempt, SEND_MAX_BACKOFF)
+        logging.warning("Sending reminder %s failed, retrying in %s s", task_id, wait)
+        await asyncio.sleep(wait)
+
+def start_reminder(task_id, chat_id, text, deadline, image_info=None, joke=None):
+    """Schedules a reminder task and registers it among the active reminders."""
+    task = asyncio.create_task(schedule_reminder(chat_id, text, deadline, task_id, image_info, joke))
+    # Making sure the reminder is forgotten however the task ends
+    task.add_done_callback(lambda _: forget_reminder(task_id))
+    _r_chat[task_id] = chat_id
+    _r_text[task_id] = text
+    _r_task[task_id] = task
+
+def forget_reminder(task_id):
+    """Removes a reminder from the active reminders, if it is still there."""
+    _r_task.pop(task_id, None)
+    _r_text.pop(task_id, None)
+    _r_chat.pop(task_id, None)
+
+async def store_reminder(task_id, chat_id, text, deadline_epoch, joke):
+    await reminders_db.execute(
+        "INSERT INTO reminders (task_id, chat_id, text, deadline, joke) VALUES (?, ?, ?, ?, ?)",
+        (task_id, chat_id, text, deadline_epoch, joke)
+    )
+    await reminders_db.commit()
+
+async def delete_stored_reminder(task_id):
+    await reminders_db.execute("DELETE FROM reminders WHERE task_id = ?", (task_id,))
+    await reminders_db.commit()
+
+async def restore_reminders():
+    """Reschedules the reminders stored before the last shutdown; overdue ones fire right away."""
+    global _next_id
+    loop = asyncio.get_running_loop()
+    now = time.time()
+    async with reminders_db.execute("SELECT task_id, chat_id, text, deadline, joke FROM reminders") as cursor:
+        async for task_id, chat_id, text, deadline_epoch, joke in cursor:
+            # Images aren't stored, so restored reminders are sent with the text and joke only
+            start_reminder(task_id, chat_id, text, loop.time() + max(0, deadline_epoch - now), joke=joke)
+    # Continuing the IDs after the highest one ever stored (SQLite keeps it for AUTOINCREMENT tables),
+    # so IDs of reminders that already fired or were cancelled are still never reused
+    async with reminders_db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'reminders'") as cursor:
+        row = await cursor.fetchone()
+    _next_id = itertools.count((row[0] if row else 0) + 1)
+
+async def fetch_image_from_pexels(query):
+    # Serving repeated queries (like "buy milk") from the cache instead of searching Pexels again
+    key = query.strip().lower()
+    cached = _pexels_cache.get(key)
+    if cached and time.monotonic() - cached[0] < PEXELS_CACHE_TTL:
+        _pexels_cache.move_to_end(key)
+        photo_info = cached[1]
+    else:
+        photo_info = await search_pexels(key)
+        # Caching only found photos, so a failed search is retried next time
+        if photo_info:
+            _pexels_cache[key] = (time.monotonic(), photo_info)
+            _pexels_cache.move_to_end(key)
+            if len(_pexels_cache) > PEXELS_CACHE_SIZE:
+                _pexels_cache.popitem(last=False)
+    if not photo_info:
+        return None
 
-def fetch_image_from_pexels(query):
+    image_url, photographer, photographer_url = photo_info
+    # Downloading the image now, so sending the reminder doesn't depend on Pexels
+    async with _pexels_sem:
+        async with http_client.get(image_url) as image_response:
+            if image_response.status != 200:
+                return None
+            image_bytes = await image_response.read()
+    return (image_bytes, photographer, photographer_url)
+
+async def search_pexels(query):
     headers = {
         "Authorization": PEXELS_API_KEY
     }
@@ -96,35 +315,57 @@ def fetch_image_from_pexels(query):
         "query": query,
         "per_page": 1
     }
-    response = requests.get("https://api.pexels.com/v1/search", headers=headers, params=params)
-    
-    if response.status_code == 200:
-        data = response.json()
-        if "photos" in data and len(data["photos"]) > 0:
-            return (
-                data["photos"][0]["src"].get("original", None),
-                data["photos"][0].get("photographer", None),
-                data["photos"][0].get("photographer_url", None)
-            )
+    for attempt in range(PEXELS_RETRIES + 1):
+        async with _pexels_sem:
+            async with http_client.get("https://api.pexels.com/v1/search", headers=headers, params=params) as response:
+                status = response.status
+                retry_after = response.headers.get("Retry-After", "")
+                if status == 200:
+                    data = await response.json()
+        if status != 429 or attempt == PEXELS_RETRIES:
+            break
+        wait = int(retry_after) if retry_after.isdigit() else 2 ** attempt
+        if wait > PEXELS_MAX_RETRY_WAIT:
+            break
+        # Backing off outside the semaphore, so other requests can go ahead meanwhile
+        await asyncio.sleep(wait)
+    if status != 200:
+        return None
+
+    if "photos" in data and len(data["photos"]) > 0:
+        photo = data["photos"][0]
+        # "large2x" stays well under Telegram's photo size limit, unlike some originals
+        image_url = photo["src"].get("large2x") or photo["src"].get("original")
+        if not image_url:
+            return None
+        return (
+            image_url,
+            photo.get("photographer", None),
+            photo.get("photographer_url", None)
+        )
     return None
 
-def get_image_from_text(text):
-    # Checking the length of the text; skipping image generation, if too long
-    if len(text.split()) > 8:  # For example, if the text contains more than 5 words, skip
+async def get_image_from_text(text):
+    # Keeping only words with letters, so punctuation or numbers alone don't trigger a search
+    words = [word for word in text.split() if any(c.isalpha() for c in word)]
+    # Skipping image generation, if there is nothing to search for or the text is too long
+    if not words or len(words) > 8:
         return None
     else:
-        #Using the text directly to fetch an image, if it is short
-        image_info = fetch_image_from_pexels(text)
+        #Using the remaining words directly to fetch an image, if the text is short
+        image_info = await fetch_image_from_pexels(" ".join(words))
         return image_info
     
-def get_joke(text):
+async def get_joke(text):
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "user", "content": f"Tell me a joke that relates to the context of the following text: {text}"}
-            ]
-        )
+        # The OpenAI client already retries 429s with back-off, so only bounding concurrency here
+        async with _openai_sem:
+            completion = await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "user", "content": f"Tell me a joke that relates to the context of the following text: {text}"}
+                ]
+            )
         # Accessing the joke from the response (checking the structure)
         if completion.choices and completion.choices[0].message:
             return completion.choices[0].message.content
@@ -133,6 +374,31 @@ def get_joke(text):
     except Exception as e:
         return f"An error occurred: {str(e)}"
 
+# Reply texts, built once at import time
+HELP_TEXT = (
+    "Here are the commands you can use:\n\n"
+    "<b>/help</b> - See a list of available commands (you triggered this message by using /help)\n"
+    "<b>/start</b> - Get started with the bot!\n"
+    "<b>/remindme</b> - Set a reminder with the following formats:\n"
+    "<blockquote>"
+    "   1. <b>For a delay</b>: Use hours (h), minutes (m), and seconds (s), like:\n"
+    "      - <code>10h</code>, <code>15m</code>, <code>23s</code>, <code>10h12m32s</code>, <code>32m50s</code>, <code>10h20s</code>, <code>2h5m</code>\n"
+    "   2. <b>For a specific time</b>: Use the format <code>HH:MM</code> or <code>HH:MMam/pm</code>, like:\n"
+    "      - <code>13:49</code>, <code>20:12</code>, <code>7:15</code>, <code>12:00pm</code>, <code>6:51pm</code>, <code>3:02am</code>\n"
+    "   After the time, add a space and then your task, like:\n"
+    "      - <code>buy milk</code>, <code>water the plants</code>, etc.\n"
+    "   <b>Example 1:</b> <code>/remindme 3h12m buy milk</code>\n"
+    "   <b>Example 2:</b> <code>/remindme 3:00pm Water the plants</code>\n"
+    "</blockquote>"
+    "<b>/cancel</b> - Choose a reminder to cancel\n"
+    "\nUse these commands to interact with me!"
+)
+
+FORMAT_HINT_TEXT = "Please make sure to use the correct format. \nExample: /remindme 2h15m Buy milk \nUse /help to learn more."
+MISSING_TASK_TEXT = "Failed to parse the task. Make sure to include a space before and after the time. \nExample: /remindme 2h15m Buy milk"
+INVALID_TIME_TEXT = "Invalid time format! \nUse HH:MM (24h) or HH:MMam/pm (12h)."
+INVALID_DELAY_TEXT = "Please provide time in the correct format. \nUse /help to learn more. \nExample: /remindme 2h15m Buy milk"
+
 @dp.message(CommandStart())
 async def command_start_handler(message: Message) -> None:
     """
@@ -150,53 +416,67 @@ async def command_remindme_handler(message: Message) -> None:
     parts = message_text.split(maxsplit=1)
     if len(parts)>0:    
         # Checking if it's a time string or specific time
-        if re.match(r"^\d{1,2}:\d{2}(?:[apAP][mM])?$", parts[0]):  
+        if looks_like_hhmm(parts[0]):  
             try:
-                if "am" in parts[0].lower() or "pm" in parts[0].lower():
-                    scheduled_time_t = datetime.strptime(parts[0], "%I:%M%p").time()  # 12-hour format
-                else:
-                    scheduled_time_t = datetime.strptime(parts[0], "%H:%M").time()  # 24-hour format
-
-                formatted_time = scheduled_time_t.strftime("%I:%M %p") # Example: "05:30 PM"
-                now = datetime.now()
-                scheduled_time = datetime.combine(now.date(), scheduled_time_t)
+                scheduled_time_t = parse_hhmm(parts[0])
+                formatted_time = format_time(scheduled_time_t) # Example: "05:30 PM"
+                # Aware in TZ if it's set, otherwise naive local time
+                now = datetime.now(TZ)
+                scheduled_time = datetime.combine(now.date(), scheduled_time_t, tzinfo=TZ)
 
                 # Scheduling for tomorrow, if scheduled_time is earlier than now
                 if scheduled_time < now:
                     scheduled_time += timedelta(days=1)
+                # Going through a UTC timestamp, which applies the DST rules of the reminder's own date
+                # (the zone's rules if TZ is set, otherwise the host's local rules)
+                deadline_epoch = scheduled_time.timestamp()
 
                 if  len(parts) > 1:
                     task_text = parts[1]
                 else:
-                    await message.reply("Failed to parse the task. Make sure to include a space before and after the time. \nExample: /remindme 2h15m Buy milk")
+                    await message.reply(MISSING_TASK_TEXT)
                     return
             except ValueError:
-                return await message.reply("Invalid time format! \nUse HH:MM (24h) or HH:MMam/pm (12h).")
+                return await message.reply(INVALID_TIME_TEXT)
         elif any(unit in parts[0] for unit in time_units):
             # Handling flexible time (like 10h15m, 2h2m4s)
             delay = parse_time(parts[0])
             if not delay:
-                await message.reply("Please provide time in the correct format. \nUse /help to learn more. \nExample: /remindme 2h15m Buy milk")
+                await message.reply(INVALID_DELAY_TEXT)
                 return 
             if  len(parts) > 1:
                 task_text = parts[1]
-                scheduled_time = datetime.now() + timedelta(seconds=delay)
-                formatted_time = scheduled_time.strftime("%I:%M %p")  # Example: "05:30 PM"
+                deadline_epoch = time.time() + delay
+                formatted_time = format_time(datetime.fromtimestamp(deadline_epoch, TZ))  # Example: "05:30 PM"
             else:
-                await message.reply("Failed to parse the task. Make sure to include a space before and after the time. \nExample: /remindme 2h15m Buy milk")
+                await message.reply(MISSING_TASK_TEXT)
                 return       
         else:
-            await message.reply("Please make sure to use the correct format. \nExample: /remindme 2h15m Buy milk \nUse /help to learn more.")
+            await message.reply(FORMAT_HINT_TEXT)
             return
-        image_info = get_image_from_text(task_text)        
-        joke=get_joke(task_text)
-        task_id = len(reminders) + 1
+        # Fetching the image and the joke concurrently; a failed fetch just means no image/joke
+        image_info, joke = await asyncio.gather(
+            get_image_from_text(task_text),
+            get_joke(task_text),
+            return_exceptions=True
+        )
+        if isinstance(image_info, Exception):
+            image_info = None
+        if isinstance(joke, Exception):
+            joke = None
+        # Escaping user and OpenAI text once, since messages are sent with HTML parse mode
+        safe_text = html.quote(task_text)
+        if joke:
+            joke = html.quote(joke)
+        task_id = next(_next_id)
         chat_id=message.chat.id
-        task = asyncio.create_task(schedule_reminder(chat_id, task_text, scheduled_time, task_id, image_info, joke))
-        reminders[task_id] = (chat_id, task_text, task)             
-        await message.reply(f"Reminder set! I'll remind you to: {task_text} at {formatted_time}.")
+        await store_reminder(task_id, chat_id, safe_text, deadline_epoch, joke)
+        # Converting the wall-clock time into a deadline on the loop's monotonic clock
+        deadline = asyncio.get_running_loop().time() + (deadline_epoch - time.time())
+        start_reminder(task_id, chat_id, safe_text, deadline, image_info, joke)
+        await message.reply(f"Reminder set! I'll remind you to: {safe_text} at {formatted_time}.")
     else:
-        await message.reply("Please make sure to use the correct format. \nExample: /remindme 2h15m Buy milk \nUse /help to learn more.")
+        await message.reply(FORMAT_HINT_TEXT)
         return
 
 # Definition of FSM states
@@ -207,11 +487,11 @@ class CancelReminder(StatesGroup):
 async def cancel_reminder(message: Message, state: FSMContext):
     user_id = message.from_user.id
 
-    if not reminders:
+    if not _r_text:
         return await message.reply("No active reminders.")
 
     # Showing active reminders
-    response = "\n".join([f"{task_id}: {text}" for task_id, (_, text, _) in reminders.items()])
+    response = "\n".join(f"{task_id}: {text}" for task_id, text in _r_text.items())
     await message.reply(f"Choose a reminder to cancel by sending its ID:\n{response}")
 
     # Setting FSM state to wait for user input
@@ -227,10 +507,11 @@ async def process_cancel_reply(message: Message, state: FSMContext):
 
     task_id = int(user_input)
 
-    if task_id in reminders:
+    if task_id in _r_task:
         # Cancelling the reminder
-        reminders[task_id][2].cancel() 
-        del reminders[task_id]
+        _r_task[task_id].cancel()
+        forget_reminder(task_id)
+        await delete_stored_reminder(task_id)
         await message.reply(f"Reminder {task_id} cancelled.")
         await state.clear()  # Clearing state after successful cancellation
     else:
@@ -241,29 +522,29 @@ async def help_command_handler(message: Message) -> None:
     """
     This handler receives messages with `/help` command and shows the bot's usage.
     """
-    help_text = (
-        "Here are the commands you can use:\n\n"
-        "<b>/help</b> - See a list of available commands (you triggered this message by using /help)\n"
-        "<b>/start</b> - Get started with the bot!\n"
-        "<b>/remindme</b> - Set a reminder with the following formats:\n"
-        "<blockquote>"
-        "   1. <b>For a delay</b>: Use hours (h), minutes (m), and seconds (s), like:\n"
-        "      - <code>10h</code>, <code>15m</code>, <code>23s</code>, <code>10h12m32s</code>, <code>32m50s</code>, <code>10h20s</code>, <code>2h5m</code>\n"
-        "   2. <b>For a specific time</b>: Use the format <code>HH:MM</code> or <code>HH:MMam/pm</code>, like:\n"
-        "      - <code>13:49</code>, <code>20:12</code>, <code>7:15</code>, <code>12:00pm</code>, <code>6:51pm</code>, <code>3:02am</code>\n"
-        "   After the time, add a space and then your task, like:\n"
-        "      - <code>buy milk</code>, <code>water the plants</code>, etc.\n"
-        "   <b>Example 1:</b> <code>/remindme 3h12m buy milk</code>\n"
-        "   <b>Example 2:</b> <code>/remindme 3:00pm Water the plants</code>\n"
-        "</blockquote>"
-        "<b>/cancel</b> - Choose a reminder to cancel\n"
-        "\nUse these commands to interact with me!"
-    )
-
-    await message.answer(help_text)
+    await message.answer(HELP_TEXT)
 
 async def main() -> None:
-    await dp.start_polling(bot)
+    global http_client, reminders_db, _pexels_sem, _openai_sem
+    if TZ_NAME and TZ is None:
+        logging.warning("Unknown time zone %r, using the host's local time", TZ_NAME)
+    _pexels_sem = asyncio.Semaphore(PEXELS_CONCURRENCY)
+    _openai_sem = asyncio.Semaphore(OPENAI_CONCURRENCY)
+    http_client = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=16, ttl_dns_cache=300),
+        timeout=aiohttp.ClientTimeout(total=10)
+    )
+    try:
+        async with aiosqlite.connect(REMINDERS_DB_PATH) as reminders_db:
+            await reminders_db.execute(
+                "CREATE TABLE IF NOT EXISTS reminders "
+                "(task_id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id INTEGER, text TEXT, deadline REAL, joke TEXT)"
+            )
+            await reminders_db.commit()
+            await restore_reminders()
+            await dp.start_polling(bot)
+    finally:
+        await http_client.close()
 
 
 if __name__ == "__main__":